@@ -1,7 +1,11 @@
 import os
 import re
 import sys
+import stat
+import time
+import heapq
 import logging
+import functools
 
 logger = logging.getLogger(__name__)
 
@@ -10,22 +14,93 @@ sys.stdout.flush()
 
 print("[APZFolderParser] Module loaded", flush=True)
 
+# Characters with special meaning in a (non-verbose) regex pattern
+_REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+# Folders changed more recently than this are listed uncached, since a change
+# landing within the same timestamp tick as a cached read would otherwise go unseen
+_LISTING_CACHE_MIN_AGE_NS = 2 * 10**9
+
+
+def _list_folder_files(folder_path, folder_stat):
+    """
+    List regular files directly inside folder_path as (filename, full_path) pairs.
+    The directory read is reused across executions (e.g. stepping file_index)
+    while the folder's device, inode, mtime and ctime are all unchanged. ctime is
+    included because tools that restore mtimes (rsync -a, tar, unzip) cannot set
+    it. Symlinks are re-checked on every call, since their targets can change
+    without touching this folder.
+    """
+    changed_ns = max(folder_stat.st_mtime_ns, folder_stat.st_ctime_ns)
+    if time.time_ns() - changed_ns < _LISTING_CACHE_MIN_AGE_NS:
+        scanned = _read_folder_files(folder_path)
+    else:
+        scanned = _read_folder_files_cached(
+            folder_path, folder_stat.st_dev, folder_stat.st_ino,
+            folder_stat.st_mtime_ns, folder_stat.st_ctime_ns,
+        )
+    
+    return tuple(
+        (name, path) for name, path, is_symlink in scanned
+        if not is_symlink or os.path.isfile(path)
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _read_folder_files_cached(folder_path, st_dev, st_ino, mtime_ns, ctime_ns):
+    return _read_folder_files(folder_path)
+
+
+def _read_folder_files(folder_path):
+    """
+    Read (filename, full_path, is_symlink) for regular files and all symlinks.
+    Symlinks are kept regardless of target so callers can resolve them fresh.
+    """
+    entries = []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            # Answered from the directory read itself on most platforms; only
+            # filesystems without d_type need a stat call
+            try:
+                if entry.is_symlink():
+                    entries.append((entry.name, entry.path, True))
+                elif entry.is_file():
+                    entries.append((entry.name, entry.path, False))
+            except OSError:
+                # Treat unreadable entries like os.path.isfile does
+                continue
+    return tuple(entries)
+
 
 class APZFolderParser:
     _sort_modes = ["none", "date_modified", "date_created", "alphabetical"]
     
+    # Sort key per mode ("none" has no entry and keeps discovery order)
+    _sort_keys = {
+        "date_modified": lambda e: os.path.getmtime(e[1]),
+        "date_created": lambda e: os.path.getctime(e[1]),
+        # Sort by filename (not full path)
+        "alphabetical": lambda e: e[0].lower(),
+    }
+    
+    # Number of paths included in the file_list output
+    _file_list_limit = 10
+    
+    # Partial sorts use heapq only when the list is at least this many times the
+    # limit: heapq's selection loop runs in Python and only beats the C sort when
+    # the limit is a small fraction of the list (break-even is around 1/12)
+    _heap_select_ratio = 16
+    
     RETURN_TYPES = ("STRING", "INT", "STRING")
     RETURN_NAMES = ("file_path", "total_files", "file_list")
     FUNCTION = "parse_folder"
     CATEGORY = "file/input"
     
     def __init__(self):
-        print("[APZFolderParser] Instance initialized")
         logger.info("APZFolderParser instance created")
     
     @classmethod
     def INPUT_TYPES(cls):
-        print("[APZFolderParser] INPUT_TYPES() called")
         input_def = {
             "required": {
                 "folder_path": ("STRING", {"default": "", "multiline": False}),
@@ -38,7 +113,6 @@ class APZFolderParser:
                 "reverse_sort": ("BOOLEAN", {"default": False}),
             }
         }
-        print(f"[APZFolderParser] INPUT_TYPES defined with {len(input_def['required'])} required inputs")
         return input_def
     
     def parse_folder(self, folder_path, file_index, enable_extension_filter, file_extensions, 
@@ -52,82 +126,94 @@ class APZFolderParser:
             file_list (str): Comma-separated list of all matching file paths
         """
         try:
-            # Normalize and validate folder path
-            folder_path = os.path.normpath(folder_path.strip())
+            # Validate and normalize folder path (abspath also normalizes, so one pass)
+            folder_path = folder_path.strip()
             
             if not folder_path:
                 raise ValueError("Folder path cannot be empty")
             
-            if not os.path.exists(folder_path):
-                raise ValueError(f"Folder path does not exist: {folder_path}")
+            folder_path = os.path.abspath(folder_path)
+            
+            # Single stat on the happy path; only probe further to explain a failure.
+            # The same stat supplies the folder identity and times that key the listing cache.
+            try:
+                folder_stat = os.stat(folder_path)
+            except (OSError, ValueError):
+                folder_stat = None
             
-            if not os.path.isdir(folder_path):
+            if folder_stat is None or not stat.S_ISDIR(folder_stat.st_mode):
+                if not os.path.exists(folder_path):
+                    raise ValueError(f"Folder path does not exist: {folder_path}")
                 raise ValueError(f"Path is not a directory: {folder_path}")
             
-            # Get absolute path (for internal processing, but keep original for logging)
-            original_path = folder_path
-            folder_path = os.path.abspath(folder_path)
-            
-            # Discover files (non-recursive, only in specified folder)
-            all_files = []
+            # Discover files (non-recursive, only in specified folder) as
+            # (filename, full_path) pairs so filters and sorts never re-derive the name
             try:
-                items = os.listdir(folder_path)
-                for item in items:
-                    item_path = os.path.join(folder_path, item)
-                    if os.path.isfile(item_path):
-                        all_files.append(item_path)
+                entries = _list_folder_files(folder_path, folder_stat)
             except PermissionError:
                 raise ValueError(f"Permission denied accessing folder: {folder_path}")
             except Exception as e:
                 raise ValueError(f"Error reading folder: {str(e)}")
             
-            if not all_files:
+            if not entries:
                 logger.warning(f"No files found in folder: {folder_path}")
                 return "", 0, ""
             
-            # Apply extension filtering
+            # Resolve the enabled filters first, then apply them in a single pass
+            extensions = frozenset()
             if enable_extension_filter:
                 extensions = self._normalize_extensions(file_extensions)
-                if extensions:
-                    all_files = [f for f in all_files if self._match_extension(f, extensions)]
             
-            # Apply regex filtering
+            name_filter = None
             if enable_regex_filter:
                 if not regex_pattern:
                     logger.warning("Regex filter enabled but pattern is empty, skipping regex filter")
+                elif _REGEX_SPECIAL_CHARS.isdisjoint(regex_pattern):
+                    # Plain literal: a substring test matches the same names without the regex engine
+                    def name_filter(name):
+                        return regex_pattern in name
                 else:
                     try:
-                        pattern = re.compile(regex_pattern)
-                        all_files = [f for f in all_files if self._match_regex(os.path.basename(f), pattern)]
+                        name_filter = re.compile(regex_pattern).search
                     except re.error as e:
                         logger.warning(f"Invalid regex pattern '{regex_pattern}': {str(e)}, skipping regex filter")
             
-            if not all_files:
+            if extensions or name_filter is not None:
+                entries = [
+                    e for e in entries
+                    if (not extensions or self._match_extension(e[0], extensions))
+                    and (name_filter is None or name_filter(e[0]))
+                ]
+            
+            if not entries:
                 logger.warning("No files matched the filter criteria")
                 return "", 0, ""
             
-            # Apply sorting
-            if sort_mode != "none":
-                all_files = self._sort_files(all_files, sort_mode, reverse_sort)
-            
-            # Validate index
-            total_files = len(all_files)
-            if file_index >= total_files:
+            # Validate index (negative values count from the end, as list indexing does)
+            total_files = len(entries)
+            if not -total_files <= file_index < total_files:
                 raise ValueError(
                     f"File index {file_index} is out of range. "
                     f"Total files found: {total_files}. Valid indices: 0 to {total_files - 1}"
                 )
             
+            # Apply sorting (a single file needs no ordering, and no stat for date modes).
+            # Only the selected file and the file list preview are output, so only
+            # that many leading entries need to be put in order. A negative index
+            # (possible from linked INT inputs) counts from the end and needs them all.
+            if sort_mode != "none" and total_files > 1:
+                limit = max(file_index + 1, self._file_list_limit) if file_index >= 0 else None
+                entries = self._sort_files(entries, sort_mode, reverse_sort, limit)
+            
             # Get file at index
-            selected_file = all_files[file_index]
+            selected_name, selected_file = entries[file_index]
             
             # Create file list string for debugging (limit length for readability)
-            file_list_str = ",".join(all_files[:10])  # First 10 files
-            if len(all_files) > 10:
-                file_list_str += f",... (+{len(all_files) - 10} more)"
+            file_list_str = ",".join(path for _, path in entries[:self._file_list_limit])
+            if total_files > self._file_list_limit:
+                file_list_str += f",... (+{total_files - self._file_list_limit} more)"
             
-            logger.info(f"FolderParser: Found {total_files} files, returning index {file_index}: {os.path.basename(selected_file)}")
-            print(f"[APZFolderParser] Successfully parsed folder: {total_files} files found, selected index {file_index}")
+            logger.info(f"FolderParser: Found {total_files} files, returning index {file_index}: {selected_name}")
             
             return selected_file, total_files, file_list_str
             
@@ -138,13 +224,14 @@ class APZFolderParser:
             logger.error(f"Unexpected error in FolderParser: {str(e)}")
             raise ValueError(f"Unexpected error: {str(e)}")
     
-    def _normalize_extensions(self, ext_string):
+    @staticmethod
+    def _normalize_extensions(ext_string):
         """
         Parse and normalize extension list from comma-separated string.
-        Returns list of normalized extensions (lowercase, with leading dot).
+        Returns frozenset of normalized extensions (lowercase, with leading dot).
         """
         if not ext_string:
-            return []
+            return frozenset()
         
         extensions = []
         for ext in ext_string.split(','):
@@ -155,57 +242,37 @@ class APZFolderParser:
                     ext = '.' + ext
                 extensions.append(ext)
         
-        return extensions
+        return frozenset(extensions)
     
-    def _match_extension(self, file_path, extensions):
+    @staticmethod
+    def _match_extension(filename, extensions):
         """
         Check if file matches any of the provided extensions (case-insensitive).
         """
-        _, ext = os.path.splitext(file_path)
+        _, ext = os.path.splitext(filename)
         return ext.lower() in extensions
     
-    def _match_regex(self, filename, pattern):
-        """
-        Check if filename matches the regex pattern.
-        """
-        return bool(pattern.search(filename))
-    
-    def _sort_files(self, files, sort_mode, reverse_sort):
+    @classmethod
+    def _sort_files(cls, entries, sort_mode, reverse_sort, limit=None):
         """
         Sort files according to the specified mode.
         
         Args:
-            files: List of file paths
+            entries: List of (filename, file_path) pairs
             sort_mode: "date_modified", "date_created", or "alphabetical"
             reverse_sort: If True, reverse the sort order
+            limit: If set, only return the first `limit` entries of the sorted order
         
         Returns:
-            Sorted list of file paths
+            Sorted list of (filename, file_path) pairs
         """
-        if sort_mode == "date_modified":
-            sorted_files = sorted(files, key=lambda f: os.path.getmtime(f), reverse=reverse_sort)
-        elif sort_mode == "date_created":
-            sorted_files = sorted(files, key=lambda f: os.path.getctime(f), reverse=reverse_sort)
-        elif sort_mode == "alphabetical":
-            # Sort by filename (not full path)
-            sorted_files = sorted(files, key=lambda f: os.path.basename(f).lower(), reverse=reverse_sort)
-        else:
-            sorted_files = files
+        sort_key = cls._sort_keys.get(sort_mode)
+        if sort_key is None:
+            return entries
         
-        return sorted_files
-
-
-# Print class attributes after class definition
-print(f"[APZFolderParser] Class defined with attributes:", flush=True)
-print(f"  RETURN_TYPES: {APZFolderParser.RETURN_TYPES}", flush=True)
-print(f"  RETURN_NAMES: {APZFolderParser.RETURN_NAMES}", flush=True)
-print(f"  FUNCTION: {APZFolderParser.FUNCTION}", flush=True)
-print(f"  CATEGORY: {APZFolderParser.CATEGORY}", flush=True)
-print(f"  _sort_modes: {APZFolderParser._sort_modes}", flush=True)
-print(f"[APZFolderParser] Has INPUT_TYPES: {hasattr(APZFolderParser, 'INPUT_TYPES')}", flush=True)
-if hasattr(APZFolderParser, 'INPUT_TYPES'):
-    try:
-        input_types = APZFolderParser.INPUT_TYPES()
-        print(f"[APZFolderParser] INPUT_TYPES() returns: {list(input_types.get('required', {}).keys())}", flush=True)
-    except Exception as e:
-        print(f"[APZFolderParser] ERROR calling INPUT_TYPES(): {e}", flush=True)
+        # Heap selection returns the same (stable) order as the head of a full sort
+        if limit is not None and limit * cls._heap_select_ratio <= len(entries):
+            select = heapq.nlargest if reverse_sort else heapq.nsmallest
+            return select(limit, entries, key=sort_key)
+        
+        return sorted(entries, key=sort_key, reverse=reverse_sort)